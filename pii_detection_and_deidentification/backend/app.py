@@ -1,60 +1,421 @@
+import io
 import os
+import csv
+import json
+import stat
 import uuid
+import atexit
 import logging
+import mimetypes
+import threading
+import shutil
+import tempfile
+import time
+import zipfile
+import itertools
+import concurrent.futures
+import functools
 import smtplib, ssl
+import email.policy
+import orjson
 from email.message import EmailMessage
+from urllib.parse import unquote
 
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, send_file, send_from_directory
 from flask_cors import CORS
-
-import pandas as pd
-from pii_redactor import EnhancedProcessor  # Your processor class
+from werkzeug.utils import secure_filename
 
 # === Config ===
+# All directories are absolute (and normalised) at import time, so paths
+# joined onto them never need os.path.abspath() on the request path.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 REPORTS_DIR = os.path.join(BASE_DIR, "reports")
-FRONTEND_DIR = os.path.join(BASE_DIR, "../frontend")
+FRONTEND_DIR = os.path.normpath(os.path.join(BASE_DIR, "../frontend"))
+INDEX_PATH = os.path.join(BASE_DIR, "index.jsonl")
+FRONTEND_INDEX = os.path.join(FRONTEND_DIR, "index.html")
+STATIC_MAX_AGE = 3600  # seconds browsers may reuse frontend assets without asking
+# Raw uploads are only needed while they are processed (and attached to an
+# alert), so they are spooled to the system temp dir and deleted afterwards.
+# UPLOAD_DIR keeps the de-identified outputs.
+SCRATCH_DIR = os.path.join(tempfile.gettempdir(), "pii_uploads")
+SCRATCH_MAX_AGE = 6 * 3600  # seconds before the sweeper removes a leftover upload
+SCRATCH_SWEEP_INTERVAL = 600  # seconds between sweeps
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+if not os.path.isfile(FRONTEND_INDEX):
+    logging.warning(f"Frontend index not found: {FRONTEND_INDEX}")
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+DETECTIONS_PAGE_SIZE = 1000  # default (and maximum) rows per /detections page
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = 2 * 1024 ** 3  # 2 GiB per upload
 CORS(app)
 
-processor = EnhancedProcessor()
+def _json_response(obj, status=200):
+    # orjson serialises straight to bytes and is much faster than jsonify on
+    # the large nested dicts/lists the processor returns. OPT_SERIALIZE_NUMPY
+    # lets numpy/pandas scalars from the processor through without a default= hook.
+    return app.response_class(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                              status=status, mimetype="application/json")
+
+# The processor pulls in pandas/matplotlib, so it is only built on first use
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_processor():
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                from pii_redactor import EnhancedProcessor  # Your processor class
+                _processor = EnhancedProcessor()
+    return _processor
 
 # === Gmail Config ===
-SENDER_EMAIL = "hackathon533@gmail.com"          # Replace with your Gmail
-APP_PASSWORD = "oalgfeohoaloyfcu" # Gmail App Password
+SENDER_EMAIL = os.environ.get("SMTP_USER")   # Your Gmail address
+APP_PASSWORD = os.environ.get("SMTP_PASS")   # Gmail App Password
+# Above this total size alerts carry download links instead of the files
+MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+# Base URL used for the download links in alert emails
+PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", "http://127.0.0.1:5000").rstrip("/")
+
+def report_dir_for(file_id):
+    return os.path.join(REPORTS_DIR, file_id)
+
+def processed_path_for(file_id):
+    return os.path.join(UPLOAD_DIR, f"{file_id}_processed.csv")
+
+# === File index ===
+# file_id -> {"upload": path, "processed": path, "reports": [paths...]}
+FILES_BY_ID = {}
+FILES_LOCK = threading.Lock()
+INDEX_JOURNAL_LOCK = threading.Lock()
+
+def _scan_reports(report_dir):
+    try:
+        with os.scandir(report_dir) as it:
+            return [e.path for e in it if e.is_file(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+def _scan_files(file_id):
+    """Rebuild an index entry from disk (e.g. for uploads made before a restart)."""
+    files = {"upload": None, "processed": None, "reports": _scan_reports(report_dir_for(file_id))}
+    # Uploads are saved as "<file_id>_<name>"; build both prefixes once, not per entry
+    prefix = f"{file_id}_"
+    processed_name = os.path.basename(processed_path_for(file_id))
+    with os.scandir(UPLOAD_DIR) as it:
+        for e in it:
+            name = e.name
+            if not name.startswith(prefix) or not e.is_file(follow_symlinks=False):
+                continue
+            if name == processed_name:
+                files["processed"] = e.path
+            else:
+                files["upload"] = e.path
+    if not files["upload"] and not files["processed"] and not files["reports"]:
+        return None
+    return files
+
+def register_files(file_id, upload_path, processed_path, report_dir):
+    files = {"upload": upload_path, "processed": processed_path, "reports": _scan_reports(report_dir)}
+    with FILES_LOCK:
+        FILES_BY_ID[file_id] = files
+    _journal_entry(file_id)
+    return files
+
+def discard_upload(file_id, upload_path):
+    """Delete a raw upload once nothing needs it and drop it from the index."""
+    try:
+        os.remove(upload_path)
+    except FileNotFoundError:
+        pass
+    with FILES_LOCK:
+        files = FILES_BY_ID.get(file_id)
+        changed = files is not None and files["upload"] == upload_path
+        if changed:
+            FILES_BY_ID[file_id] = {**files, "upload": None}
+    if changed:
+        _journal_entry(file_id)
+
+def ensure_scratch_dir():
+    """Create SCRATCH_DIR, refusing one another local user could read.
+
+    The path in the shared temp dir is predictable, and makedirs ignores mode
+    when the directory already exists, so its owner and mode are checked.
+    """
+    os.makedirs(SCRATCH_DIR, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return  # Windows: the temp dir is already per user
+    st = os.lstat(SCRATCH_DIR)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(
+            f"Refusing to use {SCRATCH_DIR}: it must be a directory owned by this user with mode 0700"
+        )
+
+def _sweep_scratch():
+    """Remove uploads left behind by crashed requests, then reschedule."""
+    cutoff = time.time() - SCRATCH_MAX_AGE
+    try:
+        with os.scandir(SCRATCH_DIR) as it:
+            for e in it:
+                try:
+                    if e.is_file(follow_symlinks=False) and e.stat().st_mtime < cutoff:
+                        os.remove(e.path)
+                except OSError:
+                    pass
+    except OSError as e:
+        logging.warning(f"Scratch sweep failed: {e}")
+    timer = threading.Timer(SCRATCH_SWEEP_INTERVAL, _sweep_scratch)
+    timer.daemon = True
+    timer.start()
+
+def is_file_id(file_id):
+    """True for ids as /upload issues them (canonical UUID strings).
+
+    Anything else could name a path outside REPORTS_DIR once joined onto it.
+    """
+    try:
+        return str(uuid.UUID(file_id)) == file_id
+    except (TypeError, ValueError):
+        return False
 
-# === Helper: send alert mail ===
-# === Helper: send alert mail with attractive HTML body ===
-def send_alert_email(file_id, recipient_email):
-    attachments = []
+def get_files(file_id):
+    """Return file_id's index entry, or None for unknown or malformed ids.
 
-    # Original uploaded file
-    for f in os.listdir(UPLOAD_DIR):
-        if f.startswith(file_id):
-            attachments.append(os.path.abspath(os.path.join(UPLOAD_DIR, f)))
+    Only well-formed ids missing from the index fall back to a disk scan.
+    """
+    if not is_file_id(file_id):
+        return None
+    with FILES_LOCK:
+        files = FILES_BY_ID.get(file_id)
+    if files is None:
+        files = _scan_files(file_id)
+        if files is not None:
+            with FILES_LOCK:
+                FILES_BY_ID[file_id] = files
+    return files
+
+def _load_index():
+    """Replay the index journal into FILES_BY_ID, then compact it.
+
+    Each line is one [file_id, entry] record and later records win. A torn
+    last line (a crash mid-append) is skipped.
+    """
+    records = 0
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    file_id, files = json.loads(line)
+                except ValueError:
+                    continue
+                FILES_BY_ID[file_id] = files
+                records += 1
+    except FileNotFoundError as e:
+        logging.info(f"No file index loaded: {e}")
+        return
+    if records > len(FILES_BY_ID):
+        _compact_index()
+
+def _compact_index():
+    """Rewrite the journal with one record per id (temp file + os.replace)."""
+    with INDEX_JOURNAL_LOCK:
+        with FILES_LOCK:
+            snapshot = list(FILES_BY_ID.items())
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=BASE_DIR, prefix="index.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record) + "\n" for record in snapshot)
+                os.replace(tmp_path, INDEX_PATH)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logging.warning(f"Could not compact file index: {e}")
+
+def _journal_entry(file_id):
+    """Append file_id's current entry to the index journal.
+
+    Only the changed entry is written, so saving stays O(1) however many
+    uploads the index holds. The entry is read under the journal lock, so the
+    last record for an id is always its newest state. A failed append is only
+    logged: entries missing from the index are rebuilt from disk on lookup.
+    """
+    with INDEX_JOURNAL_LOCK:
+        with FILES_LOCK:
+            files = FILES_BY_ID.get(file_id)
+        try:
+            with open(INDEX_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps([file_id, files]) + "\n")
+        except OSError as e:
+            logging.warning(f"Could not save file index entry: {e}")
+
+# === SMTP connection (reused across alerts) ===
+_smtp = None
+_smtp_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def ssl_context():
+    """Return the SSL context for SMTP, loading the CA bundle once per process."""
+    return ssl.create_default_context()
+
+class AlertSMTP(smtplib.SMTP_SSL):
+    """SMTP_SSL that records whether the current sendmail reached DATA."""
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+def get_smtp():
+    """Return the cached logged-in SMTP connection, connecting on first use.
+
+    Callers must hold _smtp_lock while using the connection. The connection is
+    not probed with a NOOP (a round trip per email); smtp_send reconnects when
+    the server turns out to have dropped it.
+    """
+    global _smtp
+    if _smtp is None:
+        server = AlertSMTP("smtp.gmail.com", 465, context=ssl_context())
+        server.login(SENDER_EMAIL, APP_PASSWORD)
+        _smtp = server
+    return _smtp
+
+def _drop_smtp():
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.close()
+        except OSError:
+            pass
+    _smtp = None
+
+def _connection_lost(exc):
+    # Servers close idle connections, either by hanging up or with a 421 reply
+    return isinstance(exc, smtplib.SMTPServerDisconnected) or (
+        isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code == 421
+    )
+
+def smtp_send(envelope_to, raw):
+    """Send raw message bytes over the shared connection, reconnecting once if it went stale.
+
+    Only a connection lost before DATA is retried: after that the server may
+    already have accepted the message, and a resend could deliver it twice.
+    """
+    with _smtp_lock:
+        server = get_smtp()
+        server.data_started = False
+        try:
+            server.sendmail(SENDER_EMAIL, envelope_to, raw)
+        except smtplib.SMTPException as e:
+            if not _connection_lost(e):
+                raise
+            _drop_smtp()
+            if server.data_started:
+                raise
+            logging.info("SMTP connection was closed by the server, reconnecting")
+            get_smtp().sendmail(SENDER_EMAIL, envelope_to, raw)
+
+def _close_smtp():
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
 
-    # All reports in the report folder
-    report_dir = os.path.join(REPORTS_DIR, file_id)
-    if os.path.exists(report_dir):
-        for f in os.listdir(report_dir):
-            attachments.append(os.path.abspath(os.path.join(report_dir, f)))
+atexit.register(_close_smtp)
 
-    if not attachments:
-        raise FileNotFoundError("No files found to attach. Check file_id and uploads/reports folder.")
+def _zip_attachments(attachments):
+    """Pack (path, name) attachment pairs into one in-memory zip archive.
 
-    logging.info(f"Attachments to send: {attachments}")
+    Returns (archive, pairs actually archived): files deleted since they were
+    listed are skipped.
+    """
+    buf = io.BytesIO()
+    archived = []
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as z:
+        for filepath, name in attachments:
+            # PDFs are already compressed, store them as-is
+            compress_type = zipfile.ZIP_STORED if name.lower().endswith(".pdf") else zipfile.ZIP_DEFLATED
+            try:
+                z.write(filepath, arcname=name, compress_type=compress_type)
+            except FileNotFoundError:
+                logging.info(f"Skipped deleted file: {name}")
+                continue
+            archived.append((filepath, name))
+            logging.info(f"Attached file: {name}")
+    return buf, archived
+
+def _alert_attachments(file_id):
+    files = get_files(file_id)
+    attachments = []
+    if files:
+        # Original uploaded file, its de-identified output and all reports
+        paths = [p for p in (files["upload"], files["processed"]) if p] + files["reports"]
+        # Keep (path, name) pairs so the base name is computed once per file
+        attachments = [(p, os.path.basename(p)) for p in paths]
+    return files, attachments
+
+def _build_alert_bytes(file_id, fingerprint):
+    """Render the alert message for file_id without a To: header.
+
+    fingerprint is ((path, size, mtime_ns), ...) for the files being sent.
+    Returns (message bytes, description of what was sent).
+    """
+    files = get_files(file_id)
+    attachments = [(path, os.path.basename(path)) for path, _, _ in fingerprint]
+    logging.info(f"Attachments to send: {[p for p, _ in attachments]}")
+
+    # Gmail rejects messages over 25MB and the whole archive is held in memory
+    # while the message is built, so files are attached only while they fit in
+    # MAX_ATTACHMENT_BYTES. Files that do not fit are sent as download links
+    # (the raw upload has no download and is only named).
+    sizes = {path: size for path, size, _ in fingerprint}
+    download_types = {resolve_download(files, filetype): filetype for filetype in DOWNLOAD_TYPES}
+    budget = MAX_ATTACHMENT_BYTES
+    attached, links, not_attached = [], [], []
+    for path, name in attachments:
+        size = sizes.get(path, 0)
+        if size <= budget:
+            attached.append((path, name))
+            budget -= size
+        elif download_types.get(path):
+            filetype = download_types[path]
+            links.append((filetype, f"{PUBLIC_BASE_URL}/download/{filetype}?id={file_id}"))
+        else:
+            not_attached.append(name)
+    if links or not_attached:
+        logging.info(f"{len(links) + len(not_attached)} file(s) too large to attach, sending {len(links)} download links")
+
+    # Zip before writing the body, which lists only the files that made it in
+    if attached:
+        archive, attached = _zip_attachments(attached)
+
+    file_list = ""
+    if attached:
+        file_list += f"""<p>Attached is a zip archive with the uploaded file(s) and detailed reports:</p>
+        <ol>
+            {''.join(f"<li>{name}</li>" for _, name in attached)}
+        </ol>"""
+    if links:
+        file_list += f"""<p>These reports are too large to attach. Download them here:</p>
+        <ol>
+            {''.join(f'<li><a href="{url}">{filetype}</a></li>' for filetype, url in links)}
+        </ol>"""
+    if not_attached:
+        file_list += f"""<p>Too large to attach: {', '.join(not_attached)}</p>"""
 
     # Build email
     msg = EmailMessage()
     msg['From'] = SENDER_EMAIL
-    msg['To'] = recipient_email
     msg['Subject'] = f"🚀 PII Detection Reports Ready - {file_id}"
 
     # HTML body
@@ -66,12 +427,9 @@ def send_alert_email(file_id, recipient_email):
         <p>Your <b>PII detection reports</b> have been successfully generated! 🎉</p>
         <ul>
             <li><b>File ID:</b> {file_id}</li>
-            <li><b>Total attachments:</b> {len(attachments)}</li>
+            <li><b>Total attachments:</b> {len(attached)}</li>
         </ul>
-        <p>Attached are the uploaded file(s) and detailed reports:</p>
-        <ol>
-            {''.join([f"<li>{os.path.basename(f)}</li>" for f in attachments])}
-        </ol>
+        {file_list}
         <p style="color: #555;">Please review the reports and take necessary actions on sensitive data.</p>
         <p style="margin-top: 20px;">Thank you for using our <b>PII Detection System</b>!<br>🔒 Your data security is our priority.</p>
         <hr>
@@ -81,124 +439,318 @@ def send_alert_email(file_id, recipient_email):
     """
     msg.add_alternative(html_content, subtype='html')
 
-    # Attach files
-    for filepath in attachments:
-        with open(filepath, "rb") as f:
-            data = f.read()
+    # Attach files as a single zip archive
+    if attached:
+        with archive.getbuffer() as data:
             msg.add_attachment(
                 data,
                 maintype='application',
-                subtype='octet-stream',
-                filename=os.path.basename(filepath)
+                subtype='zip',
+                filename=f"{file_id}_reports.zip"
             )
-            logging.info(f"Attached file: {os.path.basename(filepath)}")
+    sent = [f"{len(attached)} attachments"] if attached else []
+    if links:
+        sent.append(f"{len(links)} download links")
+    return msg.as_bytes(policy=email.policy.SMTP), " and ".join(sent) or "no attachments"
+
+# Rendered alerts without the raw upload, keyed on (file_id, fingerprint);
+# rewritten reports change the fingerprint and get a fresh message
+ALERT_CACHE_SIZE = 4
+_build_alert_bytes_cached = functools.lru_cache(maxsize=ALERT_CACHE_SIZE)(_build_alert_bytes)
+
+# === Helper: send alert mail with attractive HTML body ===
+def send_alert_email(file_id, recipient_email):
+    if not SENDER_EMAIL or not APP_PASSWORD:
+        raise RuntimeError("Set SMTP_USER and SMTP_PASS to send alert emails.")
+
+    files, attachments = _alert_attachments(file_id)
+    if not attachments:
+        raise FileNotFoundError("No files found to attach. Check file_id and uploads/reports folder.")
+
+    # A concurrent alert for the same upload may delete the raw upload once it
+    # is sent; files that have vanished are left out instead of failing
+    fingerprint = []
+    for path, _ in attachments:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        fingerprint.append((path, st.st_size, st.st_mtime_ns))
+    fingerprint = tuple(fingerprint)
+    # Once the raw upload is gone the message only holds reports, so it is
+    # cached: alerting more recipients about the same file reads, zips and
+    # encodes the attachments once. A message with the upload is never kept.
+    build = _build_alert_bytes if any(p == files["upload"] for p, _, _ in fingerprint) else _build_alert_bytes_cached
+    body, contents = build(file_id, fingerprint)
+    # The message is rendered without a To: header, prepend the recipient's.
+    # header_store_parse rejects CR/LF (header injection) and encodes non-ASCII names.
+    policy = email.policy.SMTP
+    to_header = policy.header_store_parse("To", recipient_email)[1]
+    raw = policy.fold_binary("To", to_header) + body
+    envelope_to = [a.addr_spec for a in to_header.addresses]
 
     # Send email
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(SENDER_EMAIL, APP_PASSWORD)
-            server.send_message(msg)
+        smtp_send(envelope_to, raw)
         logging.info(f"Email sent successfully to {recipient_email}")
-        return f"Email sent to {recipient_email} with {len(attachments)} attachments."
+        return f"Email sent to {recipient_email} with {contents}."
     except Exception as e:
         logging.error(f"Error sending email: {e}")
         raise
 
+def save_stream(stream, path):
+    """Copy an uploaded stream to disk in UPLOAD_CHUNK_SIZE reads and writes."""
+    with open(path, "wb", buffering=UPLOAD_CHUNK_SIZE) as out:
+        shutil.copyfileobj(stream, out, UPLOAD_CHUNK_SIZE)
+
+# === Background email dispatch ===
+EMAIL_POOL = None  # created by init_app()
+
+def _log_email_result(future):
+    exc = future.exception()
+    if exc is not None:
+        logging.error(f"Background email failed: {exc}")
+
+# job id -> Future of an email queued through /alert, oldest first
+ALERT_JOBS = {}
+ALERT_JOBS_LOCK = threading.Lock()
+MAX_ALERT_JOBS = 1000  # finished jobs beyond this many are forgotten
+
+def queue_alert(file_id, recipient):
+    """Send an alert email in the background and return its job id."""
+    future = EMAIL_POOL.submit(send_alert_email, file_id, recipient)
+    future.add_done_callback(_log_email_result)
+    job_id = str(uuid.uuid4())
+    with ALERT_JOBS_LOCK:
+        ALERT_JOBS[job_id] = future
+        excess = len(ALERT_JOBS) - MAX_ALERT_JOBS
+        for old_id in [j for j, f in ALERT_JOBS.items() if f.done()][:max(excess, 0)]:
+            del ALERT_JOBS[old_id]
+    return job_id
+
+# === Visual report rendering ===
+# matplotlib is not thread-safe, so every visual report is drawn by one
+# long-lived worker thread; reports for concurrent uploads queue behind it and
+# render back to back in the same, already initialised, matplotlib session
+REPORT_POOL = None  # created by init_app()
+
+# === Process start-up ===
+# The processor's spawned worker processes re-import this module (as
+# __mp_main__), and the debug reloader's parent never serves requests, so
+# nothing that reads the index, creates the scratch dir or starts threads
+# runs at import time. init_app() does it once, before the first request
+# this process serves.
+_initialised = False
+_init_lock = threading.Lock()
+
+@app.before_request
+def init_app():
+    global _initialised, EMAIL_POOL, REPORT_POOL
+    if _initialised:
+        return
+    with _init_lock:
+        if _initialised:
+            return
+        ensure_scratch_dir()
+        _load_index()
+        _sweep_scratch()
+        EMAIL_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="email")
+        atexit.register(EMAIL_POOL.shutdown, wait=True)
+        REPORT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+        atexit.register(REPORT_POOL.shutdown, wait=True)
+        _initialised = True
+
 
 # === API Routes ===
 @app.route("/")
 def serve_index():
-    return send_from_directory(FRONTEND_DIR, "index.html")
+    # Fixed, trusted path: no safe_join needed. max_age=0 makes browsers
+    # revalidate with the ETag, so unchanged pages come back as 304s.
+    return send_file(FRONTEND_INDEX, conditional=True, max_age=0)
 
 @app.route("/<path:path>")
 def serve_static(path):
-    return send_from_directory(FRONTEND_DIR, path)
+    return send_from_directory(FRONTEND_DIR, path, conditional=True, max_age=STATIC_MAX_AGE)
 
 @app.route("/upload", methods=["POST"])
 def upload_file():
-    file = request.files.get("file")
-    confidence_threshold = float(request.form.get("confidence_threshold", 0.7))
-    recipient_email = request.form.get("alert_email")  # Matches frontend input id
+    if request.mimetype == "multipart/form-data":
+        # Form upload: Werkzeug's multipart parser buffers the file for us
+        file = request.files.get("file")
+        params = request.form
+        original_name = file.filename if file else ""
+    else:
+        # Raw upload: body is the file itself, metadata comes in header/query
+        file = None
+        params = request.args
+        original_name = unquote(request.headers.get("X-Filename", ""))
 
-    if not file:
-        return jsonify({"error": "No file uploaded"}), 400
+    confidence_threshold = float(params.get("confidence_threshold", 0.7))
+    recipient_email = params.get("alert_email")  # Matches frontend input id
 
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}_{file.filename}"
-    upload_path = os.path.join(UPLOAD_DIR, filename)
-    file.save(upload_path)
-    logging.info(f"Processing uploaded file: {upload_path}")
-
-    # Create report folder
-    work_report = os.path.join(REPORTS_DIR, file_id)
-    os.makedirs(work_report, exist_ok=True)
-
-    # Process file
-    work_output = os.path.join(UPLOAD_DIR, f"{file_id}_processed.csv")
-    result = processor.process_file(upload_path, work_output, work_report, confidence_threshold)
-
-    # Generate visual report if supported
-    if hasattr(processor, "generate_visual_report"):
-        processor.generate_visual_report(work_report, os.path.join(work_report, "visual_report.pdf"))
-
-    # Automatically send email if recipient provided
-    email_status = None
-    if recipient_email:
-        try:
-            email_status = send_alert_email(file_id, recipient_email)
-        except Exception as e:
-            logging.error(f"Error sending email: {e}")
-            email_status = f"Email failed: {str(e)}"
+    if not original_name:
+        return _json_response({"error": "No file uploaded"}, 400)
 
-    return jsonify({
+    file_id = str(uuid.uuid4())
+    # secure_filename drops non-ASCII characters ("データ.csv" -> "csv"), so split
+    # off the extension first; process_file dispatches on it
+    stem, ext = os.path.splitext(original_name)
+    ext = ext.lower() if ext[1:].isascii() and ext[1:].isalnum() else ""
+    filename = f"{file_id}_{secure_filename(stem) or 'upload'}{ext}"
+    upload_path = os.path.join(SCRATCH_DIR, filename)
+    keep_upload = False
+    try:
+        # FileStorage.save would copy in 16 KiB pieces; use the same 1 MiB path for both
+        save_stream(file.stream if file else request.stream, upload_path)
+        logging.info(f"Processing uploaded file: {upload_path}")
+
+        # Report folder is created by the processor when it writes the reports
+        work_report = report_dir_for(file_id)
+
+        # Process file
+        processor = get_processor()
+        work_output = processed_path_for(file_id)
+        # Prefer the bounded-memory chunked path when the processor provides one
+        process = getattr(processor, "process_file_streaming", processor.process_file)
+        result = process(upload_path, work_output, work_report, confidence_threshold)
+
+        # Generate visual report if supported
+        if hasattr(processor, "generate_visual_report"):
+            REPORT_POOL.submit(
+                processor.generate_visual_report, work_report, os.path.join(work_report, "visual_report.pdf")
+            ).result()
+
+        register_files(file_id, upload_path, work_output, work_report)
+
+        # Automatically send email if recipient provided (in the background).
+        # The alert attaches the original upload, so it is deleted after sending.
+        email_status = None
+        if recipient_email:
+            future = EMAIL_POOL.submit(send_alert_email, file_id, recipient_email)
+            future.add_done_callback(_log_email_result)
+            future.add_done_callback(lambda _: discard_upload(file_id, upload_path))
+            keep_upload = True
+            email_status = "queued"
+    finally:
+        if not keep_upload:
+            discard_upload(file_id, upload_path)
+
+    # The detections list can be huge; clients page through it via /detections
+    summary = result.get("summary", {})
+    return _json_response({
         "id": file_id,
-        "summary": result.get("summary", {}),
-        "detections": result.get("detections", []),
+        "summary": summary,
+        "detections_url": f"/detections?id={file_id}",
+        "count": summary.get("total_detections", len(result.get("detections", []))),
         "email_status": email_status
     })
 
+@app.route("/detections")
+def list_detections():
+    file_id = request.args.get("id")
+    if not file_id:
+        return _json_response({"error": "Missing file ID"}, 400)
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = min(max(int(request.args.get("limit", DETECTIONS_PAGE_SIZE)), 0), DETECTIONS_PAGE_SIZE)
+    except ValueError:
+        return _json_response({"error": "offset and limit must be integers"}, 400)
+
+    files = get_files(file_id)
+    path = resolve_download(files, "detections") if files else None
+    if path is None:
+        return _json_response({"error": "File not found"}, 404)
+
+    # Read just the requested page instead of loading the whole CSV
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(itertools.islice(csv.DictReader(f), offset, offset + limit))
+    except FileNotFoundError:
+        return _json_response({"error": "File not found"}, 404)
+    for row in rows:
+        for field in ("row_index", "start", "end"):
+            row[field] = int(row[field])
+        row["confidence"] = float(row["confidence"])
+
+    return _json_response({"id": file_id, "offset": offset, "limit": limit, "detections": rows})
+
 @app.route("/alert", methods=["POST"])
 def alert_mail():
     file_id = request.form.get("id")
     recipient = request.form.get("email")
 
     if not file_id or not recipient:
-        return jsonify({"error": "Missing file ID or recipient"}), 400
-
-    try:
-        msg = send_alert_email(file_id, recipient)
-        return jsonify({"message": msg})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json_response({"error": "Missing file ID or recipient"}, 400)
+    if get_files(file_id) is None:
+        return _json_response({"error": "File not found"}, 404)
+
+    # Connecting to SMTP and uploading the attachments can take seconds, so the
+    # email goes out in the background; poll status_url for the outcome
+    job_id = queue_alert(file_id, recipient)
+    return _json_response({"job_id": job_id, "status": "queued", "status_url": f"/alert/{job_id}"}, 202)
+
+@app.route("/alert/<job_id>")
+def alert_status(job_id):
+    with ALERT_JOBS_LOCK:
+        future = ALERT_JOBS.get(job_id)
+    if future is None:
+        return _json_response({"error": "Unknown job ID"}, 404)
+    if not future.done():
+        return _json_response({"job_id": job_id, "status": "running" if future.running() else "queued"})
+    exc = future.exception()
+    if exc is not None:
+        return _json_response({"job_id": job_id, "status": "failed", "error": str(exc)})
+    return _json_response({"job_id": job_id, "status": "sent", "message": future.result()})
 
 # Download files endpoint
+# filetype -> (FILES_BY_ID entry key, predicate on the lower-cased report file name)
+DOWNLOAD_TYPES = {
+    "deidentified": ("processed", None),
+    "detections": ("reports", lambda name: "detections" in name),
+    "summary": ("reports", lambda name: "summary" in name),
+    "visual_report": ("reports", lambda name: name.endswith(".pdf")),
+}
+
+def resolve_download(files, filetype):
+    """Return the path of the given download type in an index entry, or None."""
+    key, match = DOWNLOAD_TYPES[filetype]
+    if match is None:
+        return files[key]
+    # Lower-case each name once and stop at the first hit
+    return next((p for p in files[key] if match(os.path.basename(p).lower())), None)
+
 @app.route("/download/<filetype>")
 def download_file(filetype):
     file_id = request.args.get("id")
     if not file_id:
-        return jsonify({"error": "Missing file ID"}), 400
-
-    if filetype == "deidentified":
-        folder = UPLOAD_DIR
-        files = [f for f in os.listdir(folder) if f.startswith(f"{file_id}_processed")]
-    elif filetype == "detections":
-        folder = os.path.join(REPORTS_DIR, file_id)
-        files = [f for f in os.listdir(folder) if "detections" in f.lower()]
-    elif filetype == "summary":
-        folder = os.path.join(REPORTS_DIR, file_id)
-        files = [f for f in os.listdir(folder) if "summary" in f.lower()]
-    elif filetype == "visual_report":
-        folder = os.path.join(REPORTS_DIR, file_id)
-        files = [f for f in os.listdir(folder) if f.endswith(".pdf")]
-    else:
-        return jsonify({"error": f"Invalid filetype: {filetype}"}), 400
+        return _json_response({"error": "Missing file ID"}, 400)
 
-    if not files:
-        return jsonify({"error": "File not found"}), 404
+    if filetype not in DOWNLOAD_TYPES:
+        return _json_response({"error": f"Invalid filetype: {filetype}"}, 400)
 
-    return send_file(os.path.join(folder, files[0]), as_attachment=True)
+    files = get_files(file_id)
+    if files is None:
+        return _json_response({"error": "File not found"}, 404)
+
+    path = resolve_download(files, filetype)
+    if path is None:
+        return _json_response({"error": "File not found"}, 404)
+
+    # Passing a path (not a handle) lets the WSGI server use wsgi.file_wrapper /
+    # sendfile, and conditional=True adds ETag, If-Modified-Since and Range support.
+    try:
+        return send_file(
+            path,
+            as_attachment=True,
+            conditional=True,
+            etag=True,
+            download_name=os.path.basename(path),
+            mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        )
+    except FileNotFoundError:
+        return _json_response({"error": "File not found"}, 404)
 
 # === Run App ===
 if __name__ == "__main__":
+    ensure_scratch_dir()  # fail at start-up rather than on the first request
     app.run(debug=True)
@@ -1,22 +1,40 @@
 import argparse
+import atexit
 import csv
+import gc
 import hashlib
+import importlib.util
+import io
 import json
+import multiprocessing
 import os
 import re
+import threading
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend to avoid threading issues
-import matplotlib.pyplot as plt
-import seaborn as sns
 from fpdf import FPDF  # For PDF export
+from fpdf.enums import XPos, YPos
 import PyPDF2  # For PDF processing
 
+try:
+    # google-re2 matches in linear time; the patterns below stick to the syntax it shares with re
+    import re2 as pattern_re
+except ImportError:
+    pattern_re = re
+
+try:
+    import pypdfium2 as pdfium  # C-backed text extraction, much faster than PyPDF2
+except ImportError:
+    pdfium = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,67 +43,74 @@ logger = logging.getLogger(__name__)
 # Enhanced Utility Functions
 # ---------------------------
 
+_NON_DIGIT_RE = re.compile(r"\D")
+
+@lru_cache(maxsize=4096)
+def digits_only(text: str) -> str:
+    """Strip everything but digits; cached as the same match is validated and then masked."""
+    return _NON_DIGIT_RE.sub("", text)
+
+_VERHOEFF_D = (
+    (0,1,2,3,4,5,6,7,8,9), (1,2,3,4,0,6,7,8,9,5), (2,3,4,0,1,7,8,9,5,6),
+    (3,4,0,1,2,8,9,5,6,7), (4,0,1,2,3,9,5,6,7,8), (5,9,8,7,6,0,4,3,2,1),
+    (6,5,9,8,7,1,0,4,3,2), (7,6,5,9,8,2,1,0,4,3), (8,7,6,5,9,3,2,1,0,4),
+    (9,8,7,6,5,4,3,2,1,0),
+)
+_VERHOEFF_P = (
+    (0,1,2,3,4,5,6,7,8,9), (1,5,7,6,2,8,3,0,9,4), (5,8,0,3,7,9,6,1,4,2),
+    (8,9,1,6,0,4,3,5,2,7), (9,4,5,3,1,2,6,8,7,0), (4,2,8,6,5,7,3,9,0,1),
+    (2,7,9,3,8,0,6,4,1,5), (7,0,4,6,9,1,3,2,5,8),
+)
+# Luhn: value of each digit after doubling (and subtracting 9 if above 9)
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
 def verhoeff_validate(num: str) -> bool:
     """Validate using Verhoeff checksum (for Aadhaar)."""
-    _d = [
-        [0,1,2,3,4,5,6,7,8,9], [1,2,3,4,0,6,7,8,9,5], [2,3,4,0,1,7,8,9,5,6],
-        [3,4,0,1,2,8,9,5,6,7], [4,0,1,2,3,9,5,6,7,8], [5,9,8,7,6,0,4,3,2,1],
-        [6,5,9,8,7,1,0,4,3,2], [7,6,5,9,8,2,1,0,4,3], [8,7,6,5,9,3,2,1,0,4],
-        [9,8,7,6,5,4,3,2,1,0]
-    ]
-    _p = [
-        [0,1,2,3,4,5,6,7,8,9], [1,5,7,6,2,8,3,0,9,4], [5,8,0,3,7,9,6,1,4,2],
-        [8,9,1,6,0,4,3,5,2,7], [9,4,5,3,1,2,6,8,7,0], [4,2,8,6,5,7,3,9,0,1],
-        [2,7,9,3,8,0,6,4,1,5], [7,0,4,6,9,1,3,2,5,8]
-    ]
-    try:
-        c = 0
-        for i, item in enumerate(reversed(num)):
-            c = _d[c][_p[(i % 8)][int(item)]]
-        return c == 0
-    except Exception:
+    if num and not num.isdecimal():
         return False
+    c = 0
+    for i, digit in enumerate(map(int, reversed(num))):
+        c = _VERHOEFF_D[c][_VERHOEFF_P[i & 7][digit]]
+    return c == 0
 
 def luhn_check(number: str) -> bool:
     """Return True if number passes Luhn mod-10."""
-    digits = [int(ch) for ch in re.sub(r"\D", "", number)]
+    digits = digits_only(number)[::-1]
     if len(digits) < 13 or len(digits) > 19:
         return False
-    checksum = 0
-    dbl = False
-    for d in reversed(digits):
-        if dbl:
-            d = d * 2
-            if d > 9:
-                d -= 9
-        checksum += d
-        dbl = not dbl
+    checksum = sum(map(int, digits[0::2])) + sum(_LUHN_DOUBLED[int(d)] for d in digits[1::2])
     return checksum % 10 == 0
 
 def validate_indian_phone(phone: str) -> bool:
     """Validate Indian mobile numbers (10 digits starting with 6-9)."""
-    digits = re.sub(r"\D", "", phone)
+    digits = digits_only(phone)
     return len(digits) == 10 and digits[0] in '6789'
 
+_IFSC_RE = re.compile(r'^[A-Z]{4}0[A-Z0-9]{6}$')
+_VOTER_ID_RE = re.compile(r'^[A-Z]{3}\d{7}$')
+_DRIVING_LICENSE_RE = re.compile(r'^[A-Z]{2}\d{2}/\d{6}/\d{4}$')
+_MEDICAL_ID_RE = re.compile(r'^MED[A-Z0-9]{8}$')
+
 def validate_ifsc(ifsc: str) -> bool:
     """Validate IFSC code format (4 letters + 0 + 6 alphanumeric)."""
-    return bool(re.match(r'^[A-Z]{4}0[A-Z0-9]{6}$', ifsc.upper()))
+    return bool(_IFSC_RE.match(ifsc.upper()))
 
 def validate_voter_id(voter_id: str) -> bool:
     """Validate Indian Voter ID (3 letters + 7 digits)."""
-    return bool(re.match(r'^[A-Z]{3}\d{7}$', voter_id.upper()))
+    return bool(_VOTER_ID_RE.match(voter_id.upper()))
 
 def validate_driving_license(dl: str) -> bool:
     """Validate Indian Driving License (state code + digits)."""
-    return bool(re.match(r'^[A-Z]{2}\d{2}/\d{6}/\d{4}$', dl.upper()))
+    return bool(_DRIVING_LICENSE_RE.match(dl.upper()))
 
 def validate_ip(ip: str) -> bool:
     """Validate IP address."""
     parts = ip.split('.')
     return len(parts) == 4 and all(0 <= int(p) <= 255 for p in parts if p.isdigit())
 
+@lru_cache(maxsize=1024)
 def validate_dob(dob: str) -> bool:
-    """Validate date of birth (dd/mm/yyyy)."""
+    """Validate date of birth (dd/mm/yyyy); cached as strptime is slow and dates repeat."""
     try:
         datetime.strptime(dob, '%d/%m/%Y')
         return True
@@ -94,32 +119,82 @@ def validate_dob(dob: str) -> bool:
 
 def validate_medical_id(mid: str) -> bool:
     """Validate Medical ID (MED + 8 alphanumeric)."""
-    return bool(re.match(r'^MED[A-Z0-9]{8}$', mid.upper()))
+    return bool(_MEDICAL_ID_RE.match(mid.upper()))
 
 # ---------------------------
 # Enhanced Patterns
 # ---------------------------
+# Order matters: where several patterns match at the same position the earliest
+# one wins (credit cards before Aadhaar, or a 16-digit card would lose to its
+# first 12 digits).
 ENHANCED_PII_PATTERNS = {
-    "aadhaar": re.compile(r"\b(?:(\d{4}\s\d{4}\s\d{4})|(\d{12}))\b"),
-    "pan": re.compile(r"\b([A-Z]{5}[0-9]{4}[A-Z])\b"),
-    "credit_card": re.compile(r"\b(?:\d[ -]*?){13,19}\b"),
-    "email": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"),
-    "phone": re.compile(r"\b(?:\+91[-\s]?)?(?:[6-9]\d{9}|[6-9]\d{2}[-\s]\d{3}[-\s]\d{4})\b"),
-    "ifsc": re.compile(r"\b([A-Z]{4}0[A-Z0-9]{6})\b"),
-    "bank_account": re.compile(r"\b\d{9,18}\b"),
-    "voter_id": re.compile(r"\b([A-Z]{3}\d{7})\b"),
-    "driving_license": re.compile(r"\b([A-Z]{2}\d{2}/\d{6}/\d{4})\b"),
-    "ip_address": re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"),
-    "dob": re.compile(r"\b(\d{2}/\d{2}/\d{4})\b"),
-    "medical_id": re.compile(r"\b(MED[A-Z0-9]{8})\b"),
+    "credit_card": pattern_re.compile(r"\b(?:\d[ -]*?){13,19}\b"),
+    "aadhaar": pattern_re.compile(r"\b(?:(\d{4}\s\d{4}\s\d{4})|(\d{12}))\b"),
+    "pan": pattern_re.compile(r"\b([A-Z]{5}[0-9]{4}[A-Z])\b"),
+    "email": pattern_re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"),
+    "phone": pattern_re.compile(r"\b(?:\+91[-\s]?)?(?:[6-9]\d{9}|[6-9]\d{2}[-\s]\d{3}[-\s]\d{4})\b"),
+    "ifsc": pattern_re.compile(r"\b([A-Z]{4}0[A-Z0-9]{6})\b"),
+    "bank_account": pattern_re.compile(r"\b\d{9,18}\b"),
+    "voter_id": pattern_re.compile(r"\b([A-Z]{3}\d{7})\b"),
+    "driving_license": pattern_re.compile(r"\b([A-Z]{2}\d{2}/\d{6}/\d{4})\b"),
+    "ip_address": pattern_re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"),
+    "dob": pattern_re.compile(r"\b(\d{2}/\d{2}/\d{4})\b"),
+    "medical_id": pattern_re.compile(r"\b(MED[A-Z0-9]{8})\b"),
 }
 
+# Literal anchors a pattern needs before it can match anywhere in the text
+# ("digit" stands for any digit); patterns whose anchors are missing are left
+# out of the scan
+PII_PATTERN_ANCHORS = {
+    "credit_card": frozenset({"digit"}),
+    "aadhaar": frozenset({"digit"}),
+    "pan": frozenset({"digit"}),
+    "email": frozenset({"@"}),
+    "phone": frozenset({"digit"}),
+    "ifsc": frozenset({"digit"}),
+    "bank_account": frozenset({"digit"}),
+    "voter_id": frozenset({"digit"}),
+    "driving_license": frozenset({"digit", "/"}),
+    "ip_address": frozenset({"digit", "."}),
+    "dob": frozenset({"digit", "/"}),
+    "medical_id": frozenset({"MED"}),
+}
+_LITERAL_ANCHORS = ("@", ".", "/", "MED")
+_DIGIT_RE = re.compile(r"\d")
+# Every pattern needs a digit, an "@" (email) or "MED" (medical_id); cells matching
+# none of them are left alone without a per-cell scan
+PII_HINT_REGEX = r"[\d@]|MED"
+
+def text_anchors(text: str) -> frozenset:
+    """Return the PII_PATTERN_ANCHORS anchors present in text."""
+    found = [anchor for anchor in _LITERAL_ANCHORS if anchor in text]
+    if _DIGIT_RE.search(text):
+        found.append("digit")
+    return frozenset(found)
+
+@lru_cache(maxsize=None)
+def fused_pattern_for(anchors: frozenset):
+    """Build the single-pass scanner for the patterns enabled by anchors.
+
+    Returns (pattern, fallbacks) or None if no pattern can match. pattern is one
+    alternation of named groups (match.lastgroup gives the PII type) and
+    fallbacks maps each type to the enabled (pii_type, pattern) pairs after it.
+    At most 2**5 anchor sets exist, so every scanner is compiled only once.
+    """
+    enabled = [(pii_type, pattern) for pii_type, pattern in ENHANCED_PII_PATTERNS.items()
+               if PII_PATTERN_ANCHORS[pii_type] <= anchors]
+    if not enabled:
+        return None
+    fused = pattern_re.compile("|".join(f"(?P<{pii_type}>{pattern.pattern})" for pii_type, pattern in enabled))
+    fallbacks = {pii_type: enabled[i + 1:] for i, (pii_type, _) in enumerate(enabled)}
+    return fused, fallbacks
+
 # ---------------------------
 # Enhanced De-identification
 # ---------------------------
 def mask_credit_card_enhanced(cc: str) -> str:
     """Enhanced credit card masking with better formatting preservation."""
-    digits = re.sub(r"\D", "", cc)
+    digits = digits_only(cc)
     if len(digits) < 13:
         return cc
     
@@ -137,7 +212,7 @@ def mask_credit_card_enhanced(cc: str) -> str:
 
 def mask_phone_enhanced(phone: str) -> str:
     """Mask phone number showing only last 4 digits."""
-    digits = re.sub(r"\D", "", phone)
+    digits = digits_only(phone)
     if len(digits) < 10:
         return phone
     
@@ -153,20 +228,24 @@ def mask_phone_enhanced(phone: str) -> str:
             result.append(char)
     return ''.join(result)
 
+# Optional secret prepended to every hashed value so tokens cannot be reversed
+# with a dictionary of known PANs/accounts; leave unset for unsalted tokens
+TOKEN_SALT = os.environ.get("PII_TOKEN_SALT", "").encode("utf-8")
+
 def anonymize_bank_account(account: str) -> str:
     """Anonymize bank account with hash-based token."""
-    token = hashlib.sha256(account.encode("utf-8")).hexdigest()[:12].upper()
+    token = hashlib.sha256(TOKEN_SALT + account.encode("utf-8")).hexdigest()[:12].upper()
     return f"ACCT_{token}"
 
 def anonymize_ifsc(ifsc: str) -> str:
     """Anonymize IFSC but keep bank code pattern."""
     bank_code = ifsc[:4]
-    token = hashlib.md5(ifsc.encode()).hexdigest()[:6].upper()
+    token = hashlib.md5(TOKEN_SALT + ifsc.encode()).hexdigest()[:6].upper()
     return f"{bank_code}0{token}"
 
 def mask_aadhaar(a: str) -> str:
     """Mask middle 4 digits; keep formatting if spaces exist."""
-    digits = re.sub(r"\D", "", a)
+    digits = digits_only(a)
     if len(digits) != 12:
         return a
     masked = digits[:4] + "XXXX" + digits[-4:]
@@ -176,7 +255,7 @@ def mask_aadhaar(a: str) -> str:
 
 def anonymize_pan(pan: str) -> str:
     """Irreversibly anonymize PAN to a stable token."""
-    token = hashlib.sha256(pan.encode("utf-8")).hexdigest()[:10].upper()
+    token = hashlib.sha256(TOKEN_SALT + pan.encode("utf-8")).hexdigest()[:10].upper()
     return f"PAN_{token}"
 
 def pseudo_email(email: str) -> str:
@@ -209,7 +288,7 @@ def mask_dob(dob: str) -> str:
 
 def anonymize_medical_id(mid: str) -> str:
     """Anonymize Medical ID."""
-    token = hashlib.sha256(mid.encode("utf-8")).hexdigest()[:8].upper()
+    token = hashlib.sha256(TOKEN_SALT + mid.encode("utf-8")).hexdigest()[:8].upper()
     return f"MED{token}"
 
 ENHANCED_DEIDENTIFY = {
@@ -227,10 +306,128 @@ ENHANCED_DEIDENTIFY = {
     "medical_id": anonymize_medical_id,
 }
 
+# ---------------------------
+# Input Readers
+# ---------------------------
+class CleanCsvReader(io.TextIOBase):
+    """Read-only text stream over a CSV with Markdown code fences and blank lines dropped.
+
+    Lines are stripped and filtered as pandas reads, so no cleaned copy of the
+    upload is written to disk.
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        self._file = open(path, "r", encoding=encoding)
+        self._lines = (
+            line + "\n"
+            for line in map(str.strip, self._file)
+            if line and not line.startswith("```")
+        )
+        self._pending = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._pending]
+        length = len(self._pending)
+        if size is None or size < 0 or length < size:
+            for line in self._lines:
+                parts.append(line)
+                length += len(line)
+                if size is not None and 0 <= size <= length:
+                    break
+        data = "".join(parts)
+        if size is None or size < 0:
+            self._pending = ""
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+# ---------------------------
+# Output Writers
+# ---------------------------
+# xlsxwriter is write-only and skips openpyxl's per-cell object model
+EXCEL_ENGINE = "xlsxwriter" if importlib.util.find_spec("xlsxwriter") else None
+
+def write_frame(df: pd.DataFrame, output_path: str):
+    """Write a de-identified frame as CSV or Excel, going by output_path's extension."""
+    if output_path.lower().endswith(".csv"):
+        df.to_csv(output_path, index=False)
+    else:
+        df.to_excel(output_path, index=False, engine=EXCEL_ENGINE)
+
+DETECTIONS_HEADER = [
+    "row_index", "column_name", "pii_type", "raw_value", 
+    "masked_value", "start", "end", "confidence", "context"
+]
+
+def detection_rows(detections) -> List[list]:
+    """Build the detections.csv rows for detections, ready for csv.writer.writerows."""
+    return [
+        [det.row_index, det.column_name, det.pii_type,
+         det.raw_value, det.masked_value, det.start,
+         det.end, f"{det.confidence:.3f}", det.context]
+        for det in detections
+    ]
+
+# FPDF core font; "Arial" is only an alias that FPDF resolves (with a warning) on every set_font
+REPORT_FONT = "helvetica"
+
+@lru_cache(maxsize=None)
+def plotting():
+    """Import matplotlib and seaborn on first use and return (Figure, sns).
+
+    They take a large share of the module's import time and are only needed
+    for the visual report.
+    """
+    import matplotlib
+    # Force the non-interactive backend (also in headless workers where a GUI
+    # backend could otherwise be picked) before pyplot is imported by seaborn
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    plt.ioff()
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    return Figure, sns
+
+def figure_png(fig: "Figure") -> io.BytesIO:
+    """Render fig once to an in-memory PNG for embedding in the PDF report."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return buf
+
+def extract_pdf_text(input_path: str) -> str:
+    """Return the text of every non-empty page, each followed by a newline."""
+    pages = []
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(input_path)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                # pdfium ends lines with \r\n
+                pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    else:
+        with open(input_path, "rb") as f:
+            for page in PyPDF2.PdfReader(f).pages:
+                pages.append(page.extract_text())
+    return "".join(page + "\n" for page in pages if page)
+
 # ---------------------------
 # Enhanced Data Classes
 # ---------------------------
-@dataclass
+# slots: one detection is created per hit, often millions per file, and
+# dropping the per-instance __dict__ saves about a quarter of their memory
+@dataclass(slots=True)
 class EnhancedDetection:
     row_index: int
     column_name: str
@@ -273,7 +470,7 @@ class EnhancedPiiDetector:
                 return 0.3
         
         if pii_type == "aadhaar":
-            digits = re.sub(r"\D", "", match_text)
+            digits = digits_only(match_text)
             if len(digits) == 12 and verhoeff_validate(digits):
                 return 0.95
             elif len(digits) == 12:
@@ -294,7 +491,7 @@ class EnhancedPiiDetector:
                 return 0.5
         
         if pii_type == "bank_account":
-            digits = re.sub(r"\D", "", match_text)
+            digits = digits_only(match_text)
             if 9 <= len(digits) <= 18:
                 context_lower = context.lower()
                 if any(keyword in context_lower for keyword in ['account', 'bank', 'acc', 'a/c']):
@@ -330,26 +527,67 @@ class EnhancedPiiDetector:
         return base_confidence
 
     def find_all_enhanced(self, text: str, context: str = "") -> List[Tuple[str, re.Match, float]]:
+        """Return non-overlapping (pii_type, match, confidence) hits in text order.
+
+        The text is scanned once with the fused pattern of the patterns whose
+        anchors it contains. If the type that matched at a position falls below
+        the threshold, the later patterns are tried at that same position; if
+        none qualifies the scan resumes one character on.
+        """
         results = []
-        for pii_type, pattern in self.patterns.items():
-            for match in pattern.finditer(text):
-                candidate = match.group(0)
-                confidence = self._calculate_confidence(pii_type, candidate, context)
-                
-                if confidence >= self.confidence_threshold:
-                    results.append((pii_type, match, confidence))
-        
+        scanner = fused_pattern_for(text_anchors(text))
+        if scanner is None:
+            return results
+        fused, fallbacks = scanner
+        pos = 0
+        while True:
+            match = fused.search(text, pos)
+            if match is None:
+                break
+            start = match.start()
+            pii_type = match.lastgroup
+            confidence = self._calculate_confidence(pii_type, match.group(0), context)
+
+            if confidence < self.confidence_threshold:
+                match = None
+                for pii_type, pattern in fallbacks[pii_type]:
+                    candidate = pattern.match(text, start)
+                    if candidate is None:
+                        continue
+                    confidence = self._calculate_confidence(pii_type, candidate.group(0), context)
+                    if confidence >= self.confidence_threshold:
+                        match = candidate
+                        break
+
+            if match is None:
+                pos = start + 1
+            else:
+                results.append((pii_type, match, confidence))
+                pos = match.end()
+
         return results
 
 # ---------------------------
 # Enhanced Processor
 # ---------------------------
+# Upper bound on EnhancedProcessor's per-instance cache of masked values
+MASK_CACHE_SIZE = 100_000
+# Rows per chunk when streaming CSVs; peak memory scales with this, not the file
+CSV_CHUNK_ROWS = 100_000
+
 class EnhancedProcessor:
-    def __init__(self, encoding: str = "utf-8", confidence_threshold: float = 0.7):
+    def __init__(self, encoding: str = "utf-8", confidence_threshold: float = 0.7,
+                 enable_visual: bool = True):
         self.detector = EnhancedPiiDetector(confidence_threshold)
         self.encoding = encoding
+        # False turns generate_visual_report into a no-op (charts are the slowest step)
+        self.enable_visual = enable_visual
         self.det_counts = Counter()
         self.confidence_stats = defaultdict(list)
+        # (pii_type, raw value) -> masked value. The same PAN/account/phone often
+        # repeats thousands of times, so each distinct value is masked or hashed
+        # once. Kept in memory only (it holds raw PII) and cleared when full.
+        self._mask_cache: Dict[Tuple[str, str], str] = {}
 
     def _deidentify_text_enhanced(self, text: str, context: str = "") -> Tuple[str, List[EnhancedDetection]]:
         detections: List[EnhancedDetection] = []
@@ -358,68 +596,225 @@ class EnhancedProcessor:
         if not all_matches:
             return text, detections
 
-        new_text = text
-        all_matches.sort(key=lambda x: x[1].start(), reverse=True)
+        # Matches are non-overlapping and in text order, so the output is built
+        # in one pass from the untouched gaps and the masked values
+        parts = []
+        pos = 0
+        short_context = context[:100] if context else ""
+        # Local bindings keep attribute and global lookups out of the per-match loop
+        mask_cache = self._mask_cache
+        det_counts = self.det_counts
+        confidence_stats = self.confidence_stats
+        deidentify = ENHANCED_DEIDENTIFY
+        add_part = parts.append
+        add_detection = detections.append
         
         for pii_type, match, confidence in all_matches:
             raw = match.group(0)
-            masked = ENHANCED_DEIDENTIFY[pii_type](raw)
-            new_text = new_text[:match.start()] + masked + new_text[match.end():]
+            key = (pii_type, raw)
+            masked = mask_cache.get(key)
+            if masked is None:
+                masked = deidentify[pii_type](raw)
+                if len(mask_cache) >= MASK_CACHE_SIZE:
+                    mask_cache.clear()
+                mask_cache[key] = masked
+            start, end = match.span()
+            add_part(text[pos:start])
+            add_part(masked)
+            pos = end
             
-            detection = EnhancedDetection(
+            add_detection(EnhancedDetection(
                 row_index=-1,
                 column_name="",
                 pii_type=pii_type,
                 raw_value=raw,
                 masked_value=masked,
-                start=match.start(),
-                end=match.end(),
+                start=start,
+                end=end,
                 confidence=confidence,
-                context=context[:100] if context else ""
-            )
-            detections.append(detection)
-            self.det_counts[pii_type] += 1
-            self.confidence_stats[pii_type].append(confidence)
+                context=short_context
+            ))
+            det_counts[pii_type] += 1
+            confidence_stats[pii_type].append(confidence)
 
-        return new_text, list(reversed(detections))
+        parts.append(text[pos:])
+        return "".join(parts), detections
 
-    def _clean_csv(self, input_path: str) -> str:
-        """Clean CSV file by removing Markdown delimiters and empty lines."""
-        with open(input_path, 'r', encoding=self.encoding) as f:
-            lines = f.readlines()
-        
-        # Remove Markdown code block delimiters and empty lines
-        cleaned_lines = [line.strip() for line in lines if line.strip() and not line.strip().startswith('```')]
-        
-        # Log raw content for debugging
-        logger.info(f"Raw CSV content: {cleaned_lines}")
-        
-        # Write cleaned content to a temporary file
-        cleaned_path = input_path + '.cleaned'
-        with open(cleaned_path, 'w', encoding=self.encoding, newline='') as f:
-            f.write('\n'.join(cleaned_lines))
-        
-        return cleaned_path
-    
+    def _open_clean_csv(self, input_path: str) -> "CleanCsvReader":
+        """Open input_path for pandas with Markdown delimiters and empty lines removed."""
+        return CleanCsvReader(input_path, self.encoding)
 
+    def _write_detections(self, detections_log_path: str, detections: List[EnhancedDetection]):
+        with open(detections_log_path, "w", encoding=self.encoding, newline="") as detf:
+            det_writer = csv.writer(detf)
+            det_writer.writerow(DETECTIONS_HEADER)
+            det_writer.writerows(detection_rows(detections))
 
-    def process_csv_enhanced(self, input_path: str, output_path: str, report_dir: str) -> Dict:
-        # Clean the CSV file before processing
-        cleaned_input_path = self._clean_csv(input_path)
-        try:
-            result = self._process_tabular(cleaned_input_path, output_path, report_dir, 
-                                        reader_func=lambda x: pd.read_csv(x, index_col=None), 
-                                        writer_func=pd.DataFrame.to_csv)
-        finally:
-            # Clean up temporary file
-            if os.path.exists(cleaned_input_path):
-                os.remove(cleaned_input_path)
-        return result
+    def process_csv_enhanced(self, input_path: str, output_path: str, report_dir: str,
+                             chunksize: int = CSV_CHUNK_ROWS) -> Dict:
+        # CSVs are always streamed in row chunks; see process_csv_streaming
+        return self.process_csv_streaming(input_path, output_path, report_dir, chunksize)
 
     def process_excel_enhanced(self, input_path: str, output_path: str, report_dir: str) -> Dict:
         return self._process_tabular(input_path, output_path, report_dir, 
                                     reader_func=lambda x: pd.read_excel(x, index_col=None), 
-                                    writer_func=pd.DataFrame.to_excel)
+                                    writer_func=write_frame)
+
+    def _deidentify_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[EnhancedDetection]]:
+        """De-identify every cell of df, split across worker processes when it is large.
+
+        Returns the de-identified frame and the detections in row order;
+        det_counts and confidence_stats are updated as if processed here.
+        """
+        workers = os.cpu_count() or 1
+        if len(df) < PARALLEL_MIN_ROWS or workers < 2:
+            return self._deidentify_frame_serial(df)
+        
+        bounds = [len(df) * i // workers for i in range(workers + 1)]
+        chunks = [df.iloc[lo:hi] for lo, hi in zip(bounds, bounds[1:])]
+        pool = get_worker_pool()
+        try:
+            results = list(pool.map(
+                _deidentify_chunk, chunks, [self.detector.confidence_threshold] * len(chunks)
+            ))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); nothing was counted yet, redo it here
+            logger.warning("Worker process died, de-identifying the frame in this process")
+            discard_worker_pool(pool)
+            return self._deidentify_frame_serial(df)
+        
+        detections: List[EnhancedDetection] = []
+        for _, chunk_detections, chunk_counts, chunk_confidences in results:
+            detections.extend(chunk_detections)
+            self.det_counts.update(chunk_counts)
+            for pii_type, confidences in chunk_confidences.items():
+                self.confidence_stats[pii_type].extend(confidences)
+        return pd.concat([r[0] for r in results]), detections
+
+    def _deidentify_frame_serial(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[EnhancedDetection]]:
+        """De-identify every cell of df, one column at a time.
+
+        Returns a frame of the same shape holding the (masked) cell text, and the
+        detections in row order. row_index is the df index label + 1.
+        """
+        detections: List[EnhancedDetection] = []
+        if df.shape[1] == 0:
+            return df.copy(), detections
+        
+        # Stringify each column once; None marks missing cells. hints flags the
+        # cells that may hold PII, found with one vectorized pass per column.
+        cells = []
+        hints = []
+        for c_i in range(df.shape[1]):
+            series = df.iloc[:, c_i]
+            texts = series.map(str).astype(object)  # empty columns keep their numeric dtype
+            present = series.notna()
+            cells.append([text if ok else None for text, ok in zip(texts.tolist(), present.tolist())])
+            hints.append((present & texts.str.contains(PII_HINT_REGEX, regex=True)).tolist())
+        # The joined row text is only needed for hinted cells, so build it on
+        # first use; rows without any hinted cell never pay for it.
+        row_contexts: List[Optional[str]] = [None] * len(df)
+        row_numbers = [int(r_i) + 1 for r_i in df.index]  # 1-indexed
+        
+        new_columns = []
+        for col, column_cells, column_hints in zip(df.columns, cells, hints):
+            new_cells = []
+            for pos, (cell, hinted) in enumerate(zip(column_cells, column_hints)):
+                if not hinted:
+                    new_cells.append(cell or "")
+                    continue
+                row_context = row_contexts[pos]
+                if row_context is None:
+                    row_context = row_contexts[pos] = " ".join(
+                        column[pos] for column in cells if column[pos] is not None
+                    )
+                new_text, dets = self._deidentify_text_enhanced(cell, row_context)
+                for detection in dets:
+                    detection.row_index = row_numbers[pos]
+                    detection.column_name = col
+                detections.extend(dets)
+                new_cells.append(new_text)
+            new_columns.append(new_cells)
+        
+        new_df = pd.DataFrame(dict(enumerate(new_columns)), index=df.index, dtype=object)
+        new_df.columns = df.columns
+        # Columns were walked one after another; restore row-major order (sort is stable)
+        detections.sort(key=lambda d: d.row_index)
+        return new_df, detections
+
+    def process_csv_streaming(self, input_path: str, output_path: str, report_dir: str,
+                              chunksize: int = CSV_CHUNK_ROWS, preview_limit: int = 1000) -> Dict:
+        """Process a CSV in fixed-size row chunks so memory stays bounded by chunksize.
+
+        Output and detections are appended chunk by chunk to temporary files that
+        replace the final paths atomically once the whole input has been processed.
+        Only the first preview_limit detections are returned; the full list is in
+        detections.csv.
+        """
+        os.makedirs(report_dir, exist_ok=True)
+        
+        detections_log_path = os.path.join(report_dir, "detections.csv")
+        summary_json_path = os.path.join(report_dir, "summary.json")
+        summary_txt_path = os.path.join(report_dir, "summary.txt")
+        output_tmp_path = output_path + ".part"
+        detections_tmp_path = detections_log_path + ".part"
+        
+        total_detections = 0
+        unique_values = defaultdict(set)
+        preview: List[Dict] = []
+        
+        logger.info(f"Processing CSV in chunks of {chunksize} rows: {input_path}")
+        
+        try:
+            with open(detections_tmp_path, "w", encoding=self.encoding, newline="") as detf:
+                det_writer = csv.writer(detf)
+                det_writer.writerow(DETECTIONS_HEADER)
+                # dtype=str: per-chunk type inference would otherwise parse the same
+                # column differently from chunk to chunk (e.g. "+91..." phones as ints)
+                with self._open_clean_csv(input_path) as cleaned, \
+                        pd.read_csv(cleaned, index_col=None, dtype=str, chunksize=chunksize) as reader:
+                    for i, chunk in enumerate(reader):
+                        # Chunks carry a RangeIndex that continues across chunks,
+                        # so row numbers stay global.
+                        new_chunk, detections = self._deidentify_frame(chunk)
+                        new_chunk.to_csv(output_tmp_path, mode="w" if i == 0 else "a",
+                                         header=(i == 0), index=False)
+                        det_writer.writerows(detection_rows(detections))
+                        for det in detections:
+                            unique_values[det.pii_type].add(det.raw_value)
+                        total_detections += len(detections)
+                        if len(preview) < preview_limit:
+                            preview.extend(d.to_dict() for d in detections[:preview_limit - len(preview)])
+                        del chunk, new_chunk, detections
+                        gc.collect()
+            
+            if not os.path.exists(output_tmp_path):
+                # Header-only CSV: pandas yields no chunks
+                with self._open_clean_csv(input_path) as cleaned:
+                    pd.read_csv(cleaned, index_col=None, dtype=str).to_csv(output_tmp_path, index=False)
+            os.replace(output_tmp_path, output_path)
+            os.replace(detections_tmp_path, detections_log_path)
+            
+            summary = self._build_summary(input_path, output_path, total_detections, {
+                pii_type: len(unique_values[pii_type]) for pii_type in self.det_counts.keys()
+            })
+            
+            with open(summary_json_path, "w", encoding=self.encoding) as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            
+            with open(summary_txt_path, "w", encoding=self.encoding) as f:
+                f.write(json.dumps(summary, indent=2, ensure_ascii=False))
+            
+            logger.info(f"Processing complete. Found {total_detections} PII instances.")
+            return {"summary": summary, "detections": preview}
+        
+        except Exception as e:
+            logger.error(f"Error processing CSV: {str(e)}")
+            raise
+        finally:
+            for path in (output_tmp_path, detections_tmp_path):
+                if os.path.exists(path):
+                    os.remove(path)
 
     def _process_tabular(self, input_path: str, output_path: str, report_dir: str, reader_func, writer_func) -> Dict:
         os.makedirs(report_dir, exist_ok=True)
@@ -440,36 +835,11 @@ class EnhancedProcessor:
             if not isinstance(df.index, pd.RangeIndex):
                 df = df.reset_index(drop=True)
                 logger.info(f"Reset index to RangeIndex: {df.index}")
-            header = list(df.columns)
-            new_df = df.copy()
-            
-            for r_i, row in df.iterrows():
-                row_context = " ".join(str(val) for val in row if pd.notna(val))
-                # Handle index as integer
-                row_index = int(r_i)
-                for c_i, col in enumerate(header):
-                    cell = str(row[col]) if pd.notna(row[col]) else ""
-                    new_text, dets = self._deidentify_text_enhanced(cell, row_context)
-                    for detection in dets:
-                        detection.row_index = row_index + 1  # 1-indexed
-                        detection.column_name = col
-                        detections_log.append(detection)
-                    new_df.at[r_i, col] = new_text
+            new_df, detections_log = self._deidentify_frame(df)
             
-            writer_func(new_df, output_path, index=False)
+            writer_func(new_df, output_path)
             
-            with open(detections_log_path, "w", encoding=self.encoding, newline="") as detf:
-                det_writer = csv.writer(detf)
-                det_writer.writerow([
-                    "row_index", "column_name", "pii_type", "raw_value", 
-                    "masked_value", "start", "end", "confidence", "context"
-                ])
-                for det in detections_log:
-                    det_writer.writerow([
-                        det.row_index, det.column_name, det.pii_type,
-                        det.raw_value, det.masked_value, det.start,
-                        det.end, f"{det.confidence:.3f}", det.context
-                    ])
+            self._write_detections(detections_log_path, detections_log)
 
             summary = self._generate_summary(input_path, output_path, detections_log)
             
@@ -521,18 +891,7 @@ class EnhancedProcessor:
             with open(output_path, "w", encoding=self.encoding) as f:
                 json.dump(new_data, f, indent=2, ensure_ascii=False)
             
-            with open(detections_log_path, "w", encoding=self.encoding, newline="") as detf:
-                det_writer = csv.writer(detf)
-                det_writer.writerow([
-                    "row_index", "column_name", "pii_type", "raw_value", 
-                    "masked_value", "start", "end", "confidence", "context"
-                ])
-                for det in detections_log:
-                    det_writer.writerow([
-                        det.row_index, det.column_name, det.pii_type,
-                        det.raw_value, det.masked_value, det.start,
-                        det.end, f"{det.confidence:.3f}", det.context
-                    ])
+            self._write_detections(detections_log_path, detections_log)
 
             summary = self._generate_summary(input_path, output_path, detections_log)
             
@@ -573,18 +932,7 @@ class EnhancedProcessor:
             with open(output_path, "w", encoding=self.encoding) as f:
                 f.write(new_text)
             
-            with open(detections_log_path, "w", encoding=self.encoding, newline="") as detf:
-                det_writer = csv.writer(detf)
-                det_writer.writerow([
-                    "row_index", "column_name", "pii_type", "raw_value", 
-                    "masked_value", "start", "end", "confidence", "context"
-                ])
-                for det in detections_log:
-                    det_writer.writerow([
-                        det.row_index, det.column_name, det.pii_type,
-                        det.raw_value, det.masked_value, det.start,
-                        det.end, f"{det.confidence:.3f}", det.context
-                    ])
+            self._write_detections(detections_log_path, detections_log)
 
             summary = self._generate_summary(input_path, output_path, detections_log)
             
@@ -613,13 +961,7 @@ class EnhancedProcessor:
         logger.info(f"Processing PDF: {input_path}")
         
         try:
-            with open(input_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted + "\n"
+            text = extract_pdf_text(input_path)
             
             new_text, dets = self._deidentify_text_enhanced(text, text)
             for detection in dets:
@@ -630,18 +972,7 @@ class EnhancedProcessor:
             with open(output_path, "w", encoding=self.encoding) as f:
                 f.write(new_text)
             
-            with open(detections_log_path, "w", encoding=self.encoding, newline="") as detf:
-                det_writer = csv.writer(detf)
-                det_writer.writerow([
-                    "row_index", "column_name", "pii_type", "raw_value", 
-                    "masked_value", "start", "end", "confidence", "context"
-                ])
-                for det in detections_log:
-                    det_writer.writerow([
-                        det.row_index, det.column_name, det.pii_type,
-                        det.raw_value, det.masked_value, det.start,
-                        det.end, f"{det.confidence:.3f}", det.context
-                    ])
+            self._write_detections(detections_log_path, detections_log)
 
             summary = self._generate_summary(input_path, output_path, detections_log)
             
@@ -660,128 +991,140 @@ class EnhancedProcessor:
     
     def process_file(self, input_path: str, output_path: str, report_dir: str, confidence_threshold: float = 0.7) -> Dict:
         file_ext = os.path.splitext(input_path)[1].lower()
-        if file_ext == ".csv":
-            return self.process_csv_enhanced(input_path, output_path, report_dir)
-        elif file_ext in [".xls", ".xlsx"]:
-            return self.process_excel_enhanced(input_path, output_path, report_dir)
-        elif file_ext == ".json":
-            return self.process_json_enhanced(input_path, output_path, report_dir)
-        elif file_ext == ".txt":
-            return self.process_txt_enhanced(input_path, output_path, report_dir)
-        elif file_ext == ".pdf":
-            return self.process_pdf_enhanced(input_path, output_path, report_dir)
-        else:
+        process = FILE_PROCESSORS.get(file_ext)
+        if process is None:
             raise ValueError(f"Unsupported file type: {file_ext}")
+        return process(self, input_path, output_path, report_dir)
+
 
+    def process_file_streaming(self, input_path: str, output_path: str, report_dir: str,
+                               confidence_threshold: float = 0.7, chunksize: int = CSV_CHUNK_ROWS) -> Dict:
+        """Like process_file, with a configurable row chunk size for CSVs."""
+        if os.path.splitext(input_path)[1].lower() == ".csv":
+            return self.process_csv_streaming(input_path, output_path, report_dir, chunksize)
+        return self.process_file(input_path, output_path, report_dir, confidence_threshold)
 
     def _generate_summary(self, input_path: str, output_path: str, detections: List[EnhancedDetection]) -> Dict:
+        unique_values = defaultdict(set)
+        for d in detections:
+            unique_values[d.pii_type].add(d.raw_value)
+        unique_values_by_type = {
+            pii_type: len(unique_values[pii_type]) for pii_type in self.det_counts.keys()
+        }
+        return self._build_summary(input_path, output_path, len(detections), unique_values_by_type)
+
+    def _build_summary(self, input_path: str, output_path: str, total_detections: int, unique_values_by_type: Dict) -> Dict:
+        # Averages and precision come from the per-type confidences gathered
+        # during detection, so the detections are not scanned again here
+        average_confidence_by_type = {}
+        estimated_precision = {}
+        for pii_type in self.det_counts.keys():
+            confidences = self.confidence_stats[pii_type]
+            if confidences:
+                average_confidence_by_type[pii_type] = sum(confidences) / len(confidences)
+                estimated_precision[pii_type] = max(0.5, sum(c > 0.8 for c in confidences) / len(confidences))
+            else:
+                average_confidence_by_type[pii_type] = 0
+                estimated_precision[pii_type] = 0.5
         summary = {
             "timestamp": datetime.now().isoformat(),
             "input_file": os.path.abspath(input_path),
             "output_file": os.path.abspath(output_path),
-            "total_detections": len(detections),
+            "total_detections": total_detections,
             "counts_by_type": dict(self.det_counts),
-            "unique_values_by_type": {
-                pii_type: len(set(d.raw_value for d in detections if d.pii_type == pii_type))
-                for pii_type in self.det_counts.keys()
-            },
-            "average_confidence_by_type": {
-                pii_type: sum(self.confidence_stats[pii_type]) / len(self.confidence_stats[pii_type]) if self.confidence_stats[pii_type] else 0
-                for pii_type in self.det_counts.keys()
-            },
-            "estimated_precision": {
-                pii_type: max(0.5, sum(c > 0.8 for c in self.confidence_stats[pii_type]) / len(self.confidence_stats[pii_type]) if self.confidence_stats[pii_type] else 0)
-                for pii_type in self.det_counts.keys()
-            },
+            "unique_values_by_type": unique_values_by_type,
+            "average_confidence_by_type": average_confidence_by_type,
+            "estimated_precision": estimated_precision,
         }
         return summary
 
-    def generate_visual_report(self, report_dir: str, output_path: str):
-        
+    def generate_visual_report(self, report_dir: str, output_path: str, parallel: bool = True):
+        """Write the PDF report of charts for the detections in report_dir.
+
+        parallel=False renders every chart in this process, which is easier to debug.
+        """
+        if not self.enable_visual:
+            return
 
         detections_path = os.path.join(report_dir, "detections.csv")
         if not os.path.exists(detections_path):
             logger.warning(f"Detections file not found: {detections_path}")
             return
 
-        df = pd.read_csv(detections_path)
+        # Only the columns the report uses are loaded. pii_type as categorical:
+        # counts and groupbys work on its integer codes. Categories follow first
+        # appearance so equal counts keep file order. confidence stays float64:
+        # in float32 e.g. 0.85 rounds up and would land in the next level.
+        df = pd.read_csv(detections_path, usecols=['pii_type', 'raw_value', 'confidence'],
+                         dtype={'pii_type': 'category', 'raw_value': str, 'confidence': 'float64'})
+        pii_type_col = df['pii_type']
+        df['pii_type'] = pii_type_col.cat.reorder_categories(
+            pii_type_col.cat.categories[pd.unique(pii_type_col.cat.codes[pii_type_col.cat.codes >= 0])]
+        )
+        if df.empty:
+            # Nothing to chart: write a one-page report without touching matplotlib
+            pdf = FPDF()
+            pdf.add_page()
+            pdf.set_font(REPORT_FONT, 'B', 16)
+            pdf.cell(0, 10, "Detection Overview", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+            pdf.ln(5)
+            pdf.set_font(REPORT_FONT, '', 12)
+            pdf.cell(0, 8, "No PII detected.")
+            pdf.output(output_path)
+            return
         
-        # Summary metrics
+        # Summary metrics. Per-type counts and confidence sums come from one
+        # groupby pass; unique values are counted across all types, as a value
+        # flagged under two types is still one value. pd.unique on the raw array
+        # skips Series.nunique's overhead; NaN is dropped from the uniques only.
+        by_type = df.groupby('pii_type', observed=True)['confidence'].agg(['size', 'sum'])
+        type_counts = by_type['size'].sort_values(ascending=False, kind='stable')
         total_detections = len(df)
-        pii_types = df['pii_type'].nunique()
-        unique_values = df['raw_value'].nunique()
-        avg_confidence = df['confidence'].mean()
+        pii_types = len(by_type)
+        raw_uniques = pd.unique(df['raw_value'].to_numpy())
+        unique_values = len(raw_uniques) - int(pd.isna(raw_uniques).any())
+        avg_confidence = by_type['sum'].sum() / total_detections
         
         summary_table = pd.DataFrame({
             "Metric": ["Total Detections", "Unique PII Values", "PII Types Detected", "Average Confidence"],
             "Value": [total_detections, unique_values, pii_types, round(avg_confidence,3)]
-        })
+        }, dtype=object)  # object keeps the counts as ints ("2259", not "2259.0")
         
         os.makedirs(report_dir, exist_ok=True)
-        image_paths = []
-
-        # 1️⃣ Bar Chart
-        plt.figure(figsize=(10,6))
-        sns.countplot(data=df, x='pii_type', palette='Set2', order=df['pii_type'].value_counts().index)
-        plt.title('PII Detections by Type', fontsize=14)
-        plt.ylabel('Count')
-        plt.xlabel('PII Type')
-        plt.xticks(rotation=45)
-        bar_chart = os.path.join(report_dir, "bar_chart.png")
-        plt.tight_layout()
-        plt.savefig(bar_chart)
-        plt.close()
-        image_paths.append(bar_chart)
-
-        # 2️⃣ Pie Chart
-        plt.figure(figsize=(8,8))
-        df['pii_type'].value_counts().plot.pie(autopct='%1.1f%%', startangle=140, colors=sns.color_palette('Set2'))
-        plt.ylabel('')
-        plt.title('Proportion of PII Types', fontsize=14)
-        pie_chart = os.path.join(report_dir, "pie_chart.png")
-        plt.tight_layout()
-        plt.savefig(pie_chart)
-        plt.close()
-        image_paths.append(pie_chart)
-
-        # 3️⃣ Histogram
-        plt.figure(figsize=(10,6))
-        sns.histplot(df['confidence'], bins=20, kde=True, color='skyblue')
-        plt.title('Confidence Score Distribution', fontsize=14)
-        plt.xlabel('Confidence')
-        plt.ylabel('Frequency')
-        hist_chart = os.path.join(report_dir, "hist_chart.png")
-        plt.tight_layout()
-        plt.savefig(hist_chart)
-        plt.close()
-        image_paths.append(hist_chart)
-
-        # 4️⃣ Stacked bar – confidence bins
-        df['confidence_bin'] = pd.cut(df['confidence'], bins=[0,0.5,0.7,0.85,1.0], labels=['Low','Medium','High','Very High'])
-        stacked_counts = df.pivot_table(index='pii_type', columns='confidence_bin', aggfunc='size', fill_value=0)
-        stacked_counts = stacked_counts[['Low','Medium','High','Very High']]
-        stacked_counts.plot(kind='bar', stacked=True, figsize=(10,6), colormap='Set2')
-        plt.title('PII Counts by Confidence Levels')
-        plt.xlabel('PII Type')
-        plt.ylabel('Count')
-        plt.xticks(rotation=45)
-        stacked_chart = os.path.join(report_dir, "stacked_chart.png")
-        plt.tight_layout()
-        plt.savefig(stacked_chart)
-        plt.close()
-        image_paths.append(stacked_chart)
-
-        # 5️⃣ Summary table as image
-        plt.figure(figsize=(10, summary_table.shape[0]*0.6 + 1))
-        plt.axis('off')
-        table_plot = plt.table(cellText=summary_table.values, colLabels=summary_table.columns, cellLoc='center', loc='center')
-        table_plot.auto_set_font_size(False)
-        table_plot.set_fontsize(10)
-        plt.title('Summary Table of PII Detections', pad=20)
-        summary_table_path = os.path.join(report_dir, "summary_table.png")
-        plt.savefig(summary_table_path, bbox_inches='tight')
-        plt.close()
-        image_paths.append(summary_table_path)
+
+        # Confidence levels (0,0.5], (0.5,0.7], (0.7,0.85], (0.85,1.0] counted per
+        # type with one groupby on the bin numbers
+        confidences = df['confidence'].to_numpy()
+        in_range = (confidences > 0) & (confidences <= 1.0)
+        confidence_bin = np.digitize(confidences[in_range], CONFIDENCE_BIN_EDGES, right=True)
+        stacked_counts = (
+            pd.DataFrame({'pii_type': df['pii_type'][in_range].reset_index(drop=True), 'confidence_bin': confidence_bin})
+            .groupby(['pii_type', 'confidence_bin'], observed=True).size()
+            .unstack('confidence_bin', fill_value=0)
+            .reindex(columns=range(len(CONFIDENCE_LEVELS)), fill_value=0)
+            .sort_index(key=lambda types: types.astype(str))  # bars in name order
+        )
+        stacked_counts.columns = pd.Index(CONFIDENCE_LEVELS, name='confidence_bin')
+
+        # Each chart gets only the data it plots; matplotlib is not thread-safe,
+        # so the charts render in worker processes when there are cores to spare
+        chart_jobs = [
+            (_render_overview_chart, type_counts),
+            (_render_hist_chart, df['confidence']),
+            (_render_stacked_chart, stacked_counts),
+        ]
+        charts = None
+        if parallel and (os.cpu_count() or 1) >= 2:
+            pool = get_worker_pool()
+            try:
+                futures = [pool.submit(*job) for job in chart_jobs]
+                charts = [future.result() for future in futures]
+            except BrokenProcessPool:
+                logger.warning("Worker process died, rendering the charts in this process")
+                discard_worker_pool(pool)
+        if charts is None:
+            charts = [render(*data) for render, *data in chart_jobs]
+        overview_chart, hist_chart, stacked_chart = (io.BytesIO(png) for png in charts)
 
         # Generate PDF
         pdf = FPDF()
@@ -789,37 +1132,155 @@ class EnhancedProcessor:
 
         # Page 1 – Overview
         pdf.add_page()
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, "Detection Overview", ln=1, align='C')
+        pdf.set_font(REPORT_FONT, 'B', 16)
+        pdf.cell(0, 10, "Detection Overview", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         pdf.ln(5)
-        pdf.set_font("Arial", '', 12)
+        pdf.set_font(REPORT_FONT, '', 12)
         pdf.multi_cell(0, 8, f"Summary of PII detections and processing results.\n\n"
                                 f"Total Detections: {total_detections}\n"
                                 f"Unique PII Values: {unique_values}\n"
                                 f"PII Types Detected: {pii_types}\n"
                                 f"Average Confidence: {round(avg_confidence,3)}")
         pdf.ln(5)
-        pdf.image(bar_chart, x=15, w=180)
-        pdf.add_page()
-        pdf.image(pie_chart, x=30, w=150)
+        pdf.image(overview_chart, x=15, w=180)
 
         # Page 2 – Confidence & Details
         pdf.add_page()
-        pdf.cell(0, 10, "Confidence Distribution", ln=1, align='C')
+        pdf.cell(0, 10, "Confidence Distribution", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         pdf.image(hist_chart, x=15, w=180)
         pdf.ln(5)
-        pdf.cell(0, 10, "Stacked Confidence Levels by PII Type", ln=1, align='C')
+        pdf.cell(0, 10, "Stacked Confidence Levels by PII Type", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         pdf.image(stacked_chart, x=15, w=180)
         pdf.add_page()
-        pdf.cell(0, 10, "Summary Table", ln=1, align='C')
-        pdf.image(summary_table_path, x=15, w=180)
+        pdf.cell(0, 10, "Summary Table", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        # Drawn as text cells, not a rendered image
+        col_width = 180 / len(summary_table.columns)
+        pdf.set_x(15)
+        pdf.set_font(REPORT_FONT, 'B', 12)
+        for column in summary_table.columns:
+            pdf.cell(col_width, 8, column, border=1, align='C')
+        pdf.ln()
+        pdf.set_font(REPORT_FONT, '', 12)
+        for row in summary_table.itertuples(index=False):
+            pdf.set_x(15)
+            for value in row:
+                pdf.cell(col_width, 8, str(value), border=1, align='C')
+            pdf.ln()
 
         pdf.output(output_path)
 
-        # Clean up temp images
-        for img in image_paths:
-            if os.path.exists(img):
-                os.remove(img)
+
+# File extension -> EnhancedProcessor method that handles it
+FILE_PROCESSORS = {
+    ".csv": EnhancedProcessor.process_csv_enhanced,
+    ".xls": EnhancedProcessor.process_excel_enhanced,
+    ".xlsx": EnhancedProcessor.process_excel_enhanced,
+    ".json": EnhancedProcessor.process_json_enhanced,
+    ".txt": EnhancedProcessor.process_txt_enhanced,
+    ".pdf": EnhancedProcessor.process_pdf_enhanced,
+}
+
+
+# ---------------------------
+# Report Charts
+# ---------------------------
+# Top-level so they can run in worker processes. Figures are built directly
+# (not through pyplot's global state) and each returns its rendered PNG bytes.
+CONFIDENCE_BIN_EDGES = [0.5, 0.7, 0.85]
+CONFIDENCE_LEVELS = ['Low', 'Medium', 'High', 'Very High']
+
+_chart_figures = threading.local()
+
+def _chart_figure(figsize) -> "Figure":
+    """Return this thread's chart Figure, cleared and resized to figsize.
+
+    Charts are drawn one after another (on the report thread or in a pool
+    worker), so one Figure is reused rather than allocated per chart.
+    """
+    fig = getattr(_chart_figures, "figure", None)
+    if fig is None:
+        Figure, _ = plotting()
+        fig = _chart_figures.figure = Figure()
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig
+
+def _render_overview_chart(type_counts: pd.Series) -> bytes:
+    """Bar chart of detections per type beside a pie of their proportions, as one figure.
+
+    Both are drawn from the precomputed type_counts; nothing is recounted here.
+    """
+    _, sns = plotting()
+    fig = _chart_figure((12,5))
+    bar_ax, pie_ax = fig.subplots(1, 2, gridspec_kw={'width_ratios': [3, 2]})
+    bar_ax.bar(type_counts.index.astype(str), type_counts.to_numpy(),
+               color=sns.color_palette('Set2', len(type_counts)))
+    bar_ax.set_title('PII Detections by Type', fontsize=14)
+    bar_ax.set_ylabel('Count')
+    bar_ax.set_xlabel('PII Type')
+    bar_ax.tick_params(axis='x', labelrotation=45)
+    type_counts.plot.pie(autopct='%1.1f%%', startangle=140, colors=sns.color_palette('Set2'), ax=pie_ax)
+    pie_ax.set_ylabel('')
+    pie_ax.set_title('Proportion of PII Types', fontsize=14)
+    fig.tight_layout()
+    return figure_png(fig).getvalue()
+
+def _render_hist_chart(confidences: pd.Series) -> bytes:
+    fig = _chart_figure((10,6))
+    ax = fig.add_subplot()
+    # Plain 20-bin histogram; a KDE fit over the scores added cost, not information
+    counts, edges = np.histogram(confidences.to_numpy(), bins=20)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='skyblue', edgecolor='black', linewidth=0.5)
+    ax.set_title('Confidence Score Distribution', fontsize=14)
+    ax.set_xlabel('Confidence')
+    ax.set_ylabel('Frequency')
+    fig.tight_layout()
+    return figure_png(fig).getvalue()
+
+def _render_stacked_chart(stacked_counts: pd.DataFrame) -> bytes:
+    fig = _chart_figure((10,6))
+    ax = fig.add_subplot()
+    stacked_counts.plot(kind='bar', stacked=True, colormap='Set2', ax=ax)
+    ax.set_title('PII Counts by Confidence Levels')
+    ax.set_xlabel('PII Type')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return figure_png(fig).getvalue()
+
+
+# ---------------------------
+# Parallel Workers
+# ---------------------------
+# Frames with at least this many rows are split across worker processes
+PARALLEL_MIN_ROWS = 20_000
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, starting it on first use."""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            # spawn rather than fork: the web app calling us runs other threads
+            _worker_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_worker_pool.shutdown)
+    return _worker_pool
+
+def discard_worker_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool whose workers died, so the next get_worker_pool() starts a fresh one."""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is pool:
+            _worker_pool = None
+    pool.shutdown(wait=False)
+
+def _deidentify_chunk(chunk: pd.DataFrame, confidence_threshold: float):
+    """Worker entry point: de-identify one slice of a frame with a fresh processor."""
+    processor = EnhancedProcessor(confidence_threshold=confidence_threshold)
+    new_chunk, detections = processor._deidentify_frame_serial(chunk)
+    return new_chunk, detections, processor.det_counts, processor.confidence_stats
 
 
 # ---------------------------
@@ -836,6 +1297,10 @@ def parse_enhanced_args():
     parser.add_argument("--confidence-threshold", "-c", type=float, default=0.7, 
                         help="Minimum confidence threshold for PII detection")
     parser.add_argument("--encoding", default="utf-8", help="File encoding")
+    parser.add_argument("--no-report", action="store_true",
+                        help="Skip the visual PDF report")
+    parser.add_argument("--single-core", action="store_true",
+                        help="Render report charts in this process instead of worker processes")
     
     return parser.parse_args()
 
@@ -844,25 +1309,17 @@ def main_enhanced():
     
     processor = EnhancedProcessor(
         encoding=args.encoding, 
-        confidence_threshold=args.confidence_threshold
+        confidence_threshold=args.confidence_threshold,
+        enable_visual=not args.no_report
     )
     
     file_ext = os.path.splitext(args.input)[1].lower()
-    if file_ext == '.csv':
-        processor.process_csv_enhanced(args.input, args.output, args.report_dir)
-    elif file_ext in ['.xls', '.xlsx']:
-        processor.process_excel_enhanced(args.input, args.output, args.report_dir)
-    elif file_ext == '.json':
-        processor.process_json_enhanced(args.input, args.output, args.report_dir)
-    elif file_ext == '.txt':
-        processor.process_txt_enhanced(args.input, args.output, args.report_dir)
-    elif file_ext == '.pdf':
-        processor.process_pdf_enhanced(args.input, args.output, args.report_dir)
-    else:
+    if file_ext not in FILE_PROCESSORS:
         raise ValueError("Unsupported file format")
+    FILE_PROCESSORS[file_ext](processor, args.input, args.output, args.report_dir)
     
     visual_report_path = os.path.join(args.report_dir, "visual_report.pdf")
-    processor.generate_visual_report(args.report_dir, visual_report_path)
+    processor.generate_visual_report(args.report_dir, visual_report_path, parallel=not args.single_core)
 
 if __name__ == "__main__":
     main_enhanced()
@@ -18,17 +18,20 @@ document.getElementById("uploadForm").addEventListener("submit", async function(
   document.getElementById("resultsSection").classList.remove("show");
   document.getElementById("processBtn").disabled = true;
 
-  const formData = new FormData();
-  formData.append("file", fileInput);
-  formData.append("confidence_threshold", confidenceThreshold);
+  // Send the file as the raw request body so the backend can stream it to disk
+  const params = new URLSearchParams({ confidence_threshold: confidenceThreshold });
   if (alertEmail) {
-    formData.append("alert_email", alertEmail);
+    params.append("alert_email", alertEmail);
   }
 
   try {
-    const response = await fetch("http://127.0.0.1:5000/upload", {
+    const response = await fetch(`http://127.0.0.1:5000/upload?${params}`, {
       method: "POST",
-      body: formData
+      headers: {
+        "Content-Type": "application/octet-stream",
+        "X-Filename": encodeURIComponent(fileInput.name)
+      },
+      body: fileInput
     });
 
     if (!response.ok) {
@@ -104,21 +107,8 @@ document.getElementById("uploadForm").addEventListener("submit", async function(
       }
     });
 
-    // Update Detections Table
-    const tableBody = document.getElementById("detectionsTableBody");
-    tableBody.innerHTML = "";
-    data.detections.forEach(det => {
-      const row = document.createElement("tr");
-      row.innerHTML = `
-        <td>${det.row_index}</td>
-        <td>${det.column_name}</td>
-        <td>${det.pii_type}</td>
-        <td>${det.raw_value}</td>
-        <td>${det.masked_value}</td>
-        <td>${det.confidence.toFixed(3)}</td>
-      `;
-      tableBody.appendChild(row);
-    });
+    // Update Detections Table (fetched separately, the upload response only has the count)
+    loadDetections(data.detections_url);
 
     // Update Metrics
     const metricsGrid = document.getElementById("metricsGrid");
@@ -156,6 +146,50 @@ document.getElementById("uploadForm").addEventListener("submit", async function(
   }
 });
 
+// Fill the detections table from the backend's paged /detections endpoint,
+// fetching pages until a short one comes back
+let detectionsLoad = 0;
+
+async function loadDetections(url) {
+  const load = ++detectionsLoad;  // a newer upload cancels this load
+  const tableBody = document.getElementById("detectionsTableBody");
+  tableBody.innerHTML = "";
+  try {
+    let offset = 0;
+    while (true) {
+      const response = await fetch(`http://127.0.0.1:5000${url}&offset=${offset}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const page = await response.json();
+      if (load !== detectionsLoad) {
+        return;
+      }
+      const rows = document.createDocumentFragment();
+      page.detections.forEach(det => {
+        const row = document.createElement("tr");
+        row.innerHTML = `
+          <td>${det.row_index}</td>
+          <td>${det.column_name}</td>
+          <td>${det.pii_type}</td>
+          <td>${det.raw_value}</td>
+          <td>${det.masked_value}</td>
+          <td>${det.confidence.toFixed(3)}</td>
+        `;
+        rows.appendChild(row);
+      });
+      tableBody.appendChild(rows);
+      if (page.detections.length === 0 || page.detections.length < page.limit) {
+        break;
+      }
+      offset += page.detections.length;
+    }
+  } catch (error) {
+    showToast(`Error loading detections: ${error.message}`, "error");
+    console.error("Error details:", error);
+  }
+}
+
 // Update confidence threshold display
 document.getElementById("confidenceThreshold").addEventListener("input", function() {
   document.querySelector(".threshold-value").textContent = this.value;